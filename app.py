@@ -34,13 +34,17 @@
 
 #OUTPUT FILES (Generated automatically in working directory):
 #- detailed_shelf_aging.csv: Current stock aging analysis
-#- shelf_time_analysis.csv: Historical shelf time data (if available)
-#- current_stock_summary.csv: Summary of current stock levels
-#- aging_categories_summary.csv: Stock categorized by age groups
+#- shelf_time_analysis.csv: Historical shelf time data, one row per purchase lot a sale drew from, in sale order (if available)
+#- current_stock_summary.csv: Summary of current stock levels, one row per product/location in order of first receipt
+#- aging_categories_summary.csv: Stock categorized by age groups, one row per purchase lot on hand with its units
 
 #REQUIREMENTS:
 #- pandas
 #- numpy
+#- numba (optional, compiles the FIFO matching loop)
+#- numexpr (optional, multi-threaded day-count arithmetic)
+#- pyarrow (optional, faster CSV reading and writing)
+#- polars (optional, faster date parsing)
 #- Python 3.6+
 
 #HOW TO INSTALL REQUIREMENTS:
@@ -56,36 +60,418 @@
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import deque
 import csv
 import sys
 import argparse
 import os
+import multiprocessing as mp
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+NS_PER_DAY = 86_400_000_000_000
+DATE_FORMAT = '%d %b %Y, %I:%M %p'
+
+# Columns of the shelf time record buffers (one record per lot drawn by a sale).
+# Day counts are int32: nanosecond timestamps only span about 584 years, so
+# any difference between two of them is at most ~213,500 days
+SHELF_TIME_COLUMNS = {
+    'product': np.int32,  # category codes, -1 when missing
+    'location': np.int32,
+    'purchase_date': np.int64,  # nanoseconds since the epoch
+    'sale_date': np.int64,
+    'shelf_time_days': np.int32,
+    'unit_cost': np.float32,
+    'purchase_reason': np.int32,
+    'sale_reason': np.int32,
+    'units': np.int64
+}
+
+# Stock aging categories; stock aged d days falls in AGING_CATEGORIES[np.digitize(d, AGING_BINS)]
+AGING_CATEGORIES = ['Fresh (0-7 days)', 'Medium (8-30 days)', 'Aged (31-90 days)', 'Very Aged (90+ days)']
+AGING_BINS = [8, 31, 91]
+
+DETAILED_AGING_COLUMNS = ['product', 'location', 'unit_number', 'purchase_date',
+                          'days_on_shelf', 'unit_cost', 'purchase_reason']
+
+# Rows converted to Python values at a time by the deque FIFO engine
+FIFO_CHUNK_ROWS = 512
+
+# Below this many rows the NumPy FIFO matcher (~0.3s per million rows) is
+# quicker than starting worker processes (~0.2s for a pool)
+PARALLEL_MIN_ROWS = 1_000_000
+
+
+def fifo_match(group_start, group_end, qtys):
+    """
+    Match sales to purchase lots in FIFO order for rows sorted into contiguous
+    groups. Returns the matched (purchase row, sale row, units) triples plus
+    the units left on each purchase row and the units fulfilled on each sale row
+    """
+    n = len(qtys)
+    purchase_idx = np.empty(n, dtype=np.int64)
+    sale_idx = np.empty(n, dtype=np.int64)
+    units = np.empty(n, dtype=np.int64)
+    remaining = np.zeros(n, dtype=np.int64)
+    fulfilled = np.zeros(n, dtype=np.int64)
+    
+    # Queue of open lot rows; a group never has more lots than rows
+    lots = np.empty(n, dtype=np.int64)
+    matched = 0
+    
+    for g in range(len(group_start)):
+        head = group_start[g]
+        tail = group_start[g]
+        
+        for i in range(group_start[g], group_end[g]):
+            qty = qtys[i]
+            if qty > 0:
+                lots[tail] = i
+                tail += 1
+                remaining[i] = qty
+            elif qty < 0:
+                need = -qty
+                while need > 0 and head < tail:
+                    lot = lots[head]
+                    take = min(need, remaining[lot])
+                    purchase_idx[matched] = lot
+                    sale_idx[matched] = i
+                    units[matched] = take
+                    matched += 1
+                    remaining[lot] -= take
+                    need -= take
+                    if remaining[lot] == 0:
+                        head += 1
+                fulfilled[i] = -qty - need
+    
+    return purchase_idx[:matched], sale_idx[:matched], units[:matched], remaining, fulfilled
+
+
+if njit is not None:
+    fifo_match = njit(cache=True)(fifo_match)
+
+
+def _fifo_match_numpy(group_start, group_end, qtys):
+    """
+    NumPy equivalent of fifo_match, used when Numba is not installed. All
+    groups are matched at once: every purchased unit gets a position on one
+    running axis and sales claim the positions of their group in order
+    """
+    n = len(qtys)
+    remaining = np.zeros(n, dtype=np.int64)
+    fulfilled = np.zeros(n, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int64)
+    if n == 0:
+        return empty, empty, empty, remaining, fulfilled
+    
+    group = np.repeat(np.arange(len(group_start)), group_end - group_start)
+    
+    # Stock on hand after each event; a sale can never take it below zero
+    level = pd.Series(qtys).groupby(group).cumsum()
+    level = (level - np.minimum(level.groupby(group).cummin(), 0)).to_numpy(np.int64)
+    previous_level = np.empty_like(level)
+    previous_level[1:] = level[:-1]
+    previous_level[group_start] = 0
+    fulfilled[:] = np.where(qtys < 0, previous_level - level, 0)
+    
+    # Each group's lots occupy [base, base + purchased) on the unit axis and its
+    # sales take [base, base + sold) from the front
+    lot_units = np.maximum(qtys, 0)
+    lot_cum = np.cumsum(lot_units)
+    sold_cum = np.cumsum(fulfilled)
+    base = (lot_cum - lot_units)[group_start]
+    sold_before = (sold_cum - fulfilled)[group_start]
+    sold = sold_cum[group_end - 1] - sold_before
+    sold_end = base + sold
+    
+    lot_idx = np.flatnonzero(qtys > 0)
+    lot_end = lot_cum[lot_idx]
+    sale_idx = np.flatnonzero(fulfilled > 0)
+    sale_end = base[group[sale_idx]] + sold_cum[sale_idx] - sold_before[group[sale_idx]]
+    
+    # Whatever has not been sold stays on the shelf
+    remaining[lot_idx] = np.clip(lot_end - sold_end[group[lot_idx]], 0, qtys[lot_idx])
+    
+    if not len(sale_idx):
+        return empty, empty, empty, remaining, fulfilled
+    
+    # Split the sold ranges wherever a lot or a sale boundary falls, dropping
+    # the gaps between one group's sold range and the next
+    selling = sold > 0
+    inside = lot_end < sold_end[group[lot_idx]]
+    points = np.union1d(np.union1d(base[selling], lot_end[inside]), sale_end)
+    seg_start, seg_end = points[:-1], points[1:]
+    owner = np.searchsorted(base[selling], seg_start, side='right') - 1
+    keep = seg_start < sold_end[selling][owner]
+    seg_start, seg_end = seg_start[keep], seg_end[keep]
+    
+    return (lot_idx[np.searchsorted(lot_end, seg_start, side='right')],
+            sale_idx[np.searchsorted(sale_end, seg_start, side='right')],
+            seg_end - seg_start, remaining, fulfilled)
+
+
+def _fifo_match_shard(shard):
+    """
+    Run the FIFO matcher on one contiguous run of groups (multiprocessing worker).
+    Row indices in the result are relative to the start of the shard
+    """
+    group_start, group_end, qtys = shard
+    match = fifo_match if njit is not None else _fifo_match_numpy
+    return match(group_start, group_end, qtys)
+
+
+def match_groups(group_start, group_end, qtys):
+    """
+    FIFO-match every group, sharding the groups across worker processes for
+    large inputs when only the NumPy matcher is available (the compiled one
+    finishes before a pool could start). Groups never share stock, so shards
+    are independent
+    """
+    processes = mp.cpu_count()
+    if njit is not None or len(qtys) < PARALLEL_MIN_ROWS or processes < 2 or len(group_start) < 2:
+        return _fifo_match_shard((group_start, group_end, qtys))
+    
+    shards = []
+    for groups in np.array_split(np.arange(len(group_start)), processes * 4):
+        if len(groups):
+            first, last = group_start[groups[0]], group_end[groups[-1]]
+            shards.append((first, (group_start[groups] - first, group_end[groups] - first, qtys[first:last])))
+    
+    with mp.Pool(processes) as pool:
+        results = pool.map(_fifo_match_shard, [shard for _, shard in shards])
+    
+    purchase, sale, units, remaining, fulfilled = zip(*results)
+    offsets = [first for first, _ in shards]
+    return (np.concatenate([p + o for p, o in zip(purchase, offsets)]),
+            np.concatenate([s + o for s, o in zip(sale, offsets)]),
+            np.concatenate(units), np.concatenate(remaining), np.concatenate(fulfilled))
+
+
+def weighted_shelf_time_stats(group, days, units, unit_cost):
+    """
+    Shelf time statistics per group over the units sold, from lot-level records
+    where each row stands for `units` identical units. group holds integer
+    codes; the result is indexed by the codes that have sales
+    """
+    codes, stats = _weighted_shelf_time_arrays(group, days, units, unit_cost)
+    return pd.DataFrame(stats, index=codes)
+
+
+def _weighted_shelf_time_arrays(group, days, units, unit_cost):
+    """
+    weighted_shelf_time_stats as plain arrays: (group codes, {statistic: values})
+    """
+    # Sort by group, then shelf time, so each group's units sit in one sorted run
+    order = np.lexsort((days, group))
+    group, days, units, unit_cost = group[order], days[order], units[order], unit_cost[order]
+    
+    changes = group[1:] != group[:-1]
+    starts = np.flatnonzero(np.concatenate(([True], changes))[:len(group)])
+    lasts = np.flatnonzero(np.concatenate((changes, [True]))[:len(group)])
+    codes = group[starts]
+    
+    count = np.add.reduceat(units, starts)
+    day_units = days * units
+    total_days = np.add.reduceat(day_units, starts).astype(np.float64)
+    total_sq_days = np.add.reduceat(day_units * days, starts).astype(np.float64)
+    total_cost = np.add.reduceat(unit_cost.astype(np.float64) * units, starts)
+    
+    mean = total_days / count
+    # Sample standard deviation, as pandas computes it over one row per unit
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(np.maximum(total_sq_days - total_days * mean, 0) / (count - 1))
+    
+    # The median averages the middle unit (or two middle units) of each run
+    cum_units = np.cumsum(units)
+    before = cum_units[starts] - units[starts]
+    lower = days[np.searchsorted(cum_units, before + (count - 1) // 2, side='right')]
+    upper = days[np.searchsorted(cum_units, before + count // 2, side='right')]
+    
+    return codes, {
+        'count': count,
+        'mean_days': mean,
+        'median_days': (lower + upper) / 2,
+        'min_days': days[starts],
+        'max_days': days[lasts],
+        'std_days': std,
+        'mean_unit_cost': total_cost / count,
+        'total_cost': total_cost
+    }
+
+
+def days_between(later_ns, earlier_ns):
+    """
+    Whole days from earlier_ns to later_ns (int64 nanoseconds, arrays or
+    scalars), rounded down like Timedelta.days. NumExpr does the subtraction
+    and division in one threaded pass when installed
+    """
+    if ne is None:
+        return (later_ns - earlier_ns) // NS_PER_DAY
+    return ne.evaluate('(later_ns - earlier_ns) // ns_per_day', local_dict={
+        'later_ns': np.asarray(later_ns, dtype=np.int64),
+        'earlier_ns': np.asarray(earlier_ns, dtype=np.int64),
+        'ns_per_day': np.int64(NS_PER_DAY)
+    })
+
+
+def write_csv(df, path):
+    """
+    Write a DataFrame to CSV without its index, using pyarrow's writer when
+    installed. Both writers produce the same text
+    """
+    if pa is None:
+        df.to_csv(path, index=False)
+        return
+    
+    # Render the values Arrow would format differently from to_csv: Periods (no
+    # Arrow rendering), datetimes (Arrow adds nanoseconds) and floats (Arrow
+    # drops the '.0' of whole numbers and spells exponents differently)
+    rendered = {}
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.PeriodDtype):
+            rendered[column] = df[column].astype(str)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            values = df[column].to_numpy(dtype='datetime64[ns]')
+            if np.any(values[~np.isnat(values)].view('i8') % 1_000_000_000):
+                # to_csv writes fractional seconds; only whole seconds are rendered here
+                df.to_csv(path, index=False)
+                return
+            rendered[column] = pc.cast(pa.array(values.astype('datetime64[s]')), pa.string())  # YYYY-MM-DD HH:MM:SS
+        elif pd.api.types.is_float_dtype(dtype):
+            values = df[column].to_numpy(dtype=getattr(dtype, 'numpy_dtype', dtype), na_value=np.nan)
+            text = values.astype(str).astype(object)
+            text[np.isnan(values)] = None
+            rendered[column] = text
+    df = df.assign(**rendered)
+    
+    # to_csv only quotes values that need it; Arrow can't do that selectively,
+    # so write unquoted (header via csv, which quotes like to_csv) and leave the
+    # rare file that needs quotes to pandas
+    try:
+        with open(path, 'w', newline='', encoding='utf-8') as out_file:
+            csv.writer(out_file, lineterminator=os.linesep).writerow(df.columns)
+            out_file.flush()
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), out_file.buffer,
+                            write_options=pacsv.WriteOptions(include_header=False, quoting_style='none',
+                                                             eol=os.linesep))
+    except pa.ArrowInvalid:
+        df.to_csv(path, index=False)
+
 
 class InventoryAnalyzer:
     def __init__(self, csv_file_path):
         """
         Initialize the inventory analyzer with CSV data
         """
-        self.df = pd.read_csv(csv_file_path)
+        # Every report measures stock age against the same moment
+        self._now = pd.Timestamp.now()
+        self._now_i8 = self._now.value  # nanoseconds
+        self.df = self._read_transactions(csv_file_path)
         self.prepare_data()
-        self.shelf_time_records = []
-        self.current_stock = defaultdict(lambda: defaultdict(deque))  # {product: {location: deque of (date, qty, cost)}}
+        self._reset_shelf_time_records()
+        self._shortages = {}  # {(sku code, location code): units sold beyond the stock on hand}
+        self._pending_shelf_time = []  # record tuples from _remove_stock, not yet in the buffers
+        self._report_cache = {}  # analytics and stock snapshots, cleared whenever stock moves
+        self.current_stock = {}  # {(sku code, location code): deque of [date_ns, unit_cost, reason, qty_remaining]}
+        # Running [qty, total_cost] per current_stock key, kept in step with its lots
+        self._stock_totals = {}
+        # Keys whose lots were not received in date order (e.g. back-dated opening stock)
+        self._unordered_stock = set()
+        
+    @staticmethod
+    def _read_transactions(csv_file_path):
+        """
+        Read the transactions CSV, using pyarrow's multithreaded reader when installed.
+        With pyarrow the low-cardinality text columns are read as strings (a column
+        that is entirely blank cannot be read as a categorical); prepare_data encodes
+        them, keeping numeric codes numeric without pyarrow
+        """
+        if pa is None:
+            return pd.read_csv(csv_file_path)
+        
+        return pd.read_csv(
+            csv_file_path,
+            engine='pyarrow',
+            dtype_backend='pyarrow',
+            dtype={
+                'Primary SKU': 'string[pyarrow]',
+                'Location': 'string[pyarrow]',
+                'Adj. reason': 'string[pyarrow]',
+                'Qty.': 'int64[pyarrow]',
+                'Cost': 'float64[pyarrow]'
+            }
+        )
+        
+    @staticmethod
+    def _parse_dates(dates):
+        """
+        Convert date strings to datetimes, trying the documented format (with
+        Polars' multithreaded parser when installed) before falling back to
+        (much slower) per-value format inference
+        """
+        if pl is not None:
+            try:
+                parsed = pl.from_pandas(dates).str.strptime(pl.Datetime('ns'), DATE_FORMAT)
+                return pd.Series(parsed.to_numpy(), index=dates.index, name=dates.name)
+            except (pl.exceptions.PolarsError, TypeError):
+                pass
+        
+        try:
+            return pd.to_datetime(dates, format=DATE_FORMAT)
+        except ValueError:
+            return pd.to_datetime(dates, format='mixed')
         
     def prepare_data(self):
         """
         Clean and prepare the data for analysis
         """
-        # Convert date string to datetime
-        self.df['DateTime'] = pd.to_datetime(self.df['Date'], format='mixed')
+        self.df['DateTime'] = self._parse_dates(self.df['Date'])
+        
+        # A blank date can't be placed in time (and would sort first as the minimum int64)
+        missing_dates = self.df['DateTime'].isna().to_numpy()
+        if missing_dates.any():
+            print(f"Warning: Skipping {missing_dates.sum()} transactions without a date")
+            self.df = self.df[~missing_dates]
         
-        # Sort by datetime to ensure chronological processing
-        self.df = self.df.sort_values('DateTime').reset_index(drop=True)
+        # Sort by datetime to ensure chronological processing; a stable sort on the
+        # raw int64 timestamps keeps same-time transactions in file order
+        order = np.argsort(self.df['DateTime'].to_numpy('datetime64[ns]').view('i8'), kind='mergesort')
+        self.df = self.df.iloc[order].reset_index(drop=True)
         
         # Clean column names (remove spaces and special characters)
         self.df.columns = self.df.columns.str.strip()
         
+        # FIFO state is keyed by the category codes of the low-cardinality text columns
+        for column in ['Primary SKU', 'Location', 'Adj. reason']:
+            self.df[column] = self.df[column].astype('category')
+        self._sku_cats = self.df['Primary SKU'].cat.categories
+        self._location_cats = self.df['Location'].cat.categories
+        self._reason_cats = self.df['Adj. reason'].cat.categories
+        
+        # Lot values for FIFO matching; the raw Cost column is kept for the reports
+        self._fifo_costs = self.df['Cost'].abs().fillna(0).to_numpy(np.float64)
+        
         print(f"Loaded {len(self.df)} transactions")
         print(f"Date range: {self.df['DateTime'].min()} to {self.df['DateTime'].max()}")
         
@@ -94,71 +480,351 @@ class InventoryAnalyzer:
         Process all inventory movements using FIFO logic
         """
         print("Processing inventory movements with FIFO logic...")
+        self._report_cache.clear()
         
-        for idx, row in self.df.iterrows():
-            product = row['Primary SKU']
-            location = row['Location']
-            qty = row['Qty.']
-            date = row['DateTime']
-            cost = abs(row['Cost']) if pd.notna(row['Cost']) else 0
-            adj_reason = row['Adj. reason']
+        # Pull each column out once instead of boxing a Series per row
+        columns = (
+            self.df['Primary SKU'].cat.codes.to_numpy(np.int64),
+            self.df['Location'].cat.codes.to_numpy(np.int64),
+            self.df['Qty.'].to_numpy(np.int64),
+            self.df['DateTime'].to_numpy('datetime64[ns]').view('i8'),
+            self._fifo_costs,
+            self.df['Adj. reason'].cat.codes.to_numpy(np.int64)
+        )
+        
+        # Bound methods are looked up once rather than on every row
+        add_stock = self._add_stock
+        remove_stock = self._remove_stock
+        
+        # Plain Python values are quicker to work with than numpy scalars, but
+        # only one chunk of rows is converted at a time to keep memory flat
+        for start in range(0, len(self.df), FIFO_CHUNK_ROWS):
+            chunk = [column[start:start + FIFO_CHUNK_ROWS].tolist() for column in columns]
+            for sku, loc, qty, date, cost, reason in zip(*chunk):
+                if qty > 0:
+                    # Stock coming in
+                    add_stock(sku, loc, date, qty, cost, reason)
+                elif qty < 0:
+                    # Stock going out
+                    remove_stock(sku, loc, date, -qty, reason)
             
-            if qty > 0:
-                # Stock coming in
-                self._add_stock(product, location, date, qty, cost, adj_reason)
-            elif qty < 0:
-                # Stock going out
-                self._remove_stock(product, location, date, abs(qty), adj_reason)
+            # Keep the pending record tuples bounded by one chunk's worth
+            self._flush_shelf_time_records()
+        self._report_shortages()
+                
+    def process_inventory_movements_vectorized(self):
+        """
+        Process all inventory movements using FIFO logic, matching sales to
+        purchase lots over whole column arrays (compiled with Numba when available)
+        """
+        print("Processing inventory movements with vectorized FIFO matching...")
+        self._report_cache.clear()
+        
+        df = self._fifo_movements()
+        products = df['product'].to_numpy(np.int64)
+        locations = df['location'].to_numpy(np.int64)
+        qtys = df['qty'].to_numpy(np.int64)
+        dates = df['date'].to_numpy(np.int64)
+        costs = df['cost'].to_numpy(np.float64)
+        reasons = df['reason'].to_numpy(np.int64)
+        rows = df['row'].to_numpy()
+        groups = df['group'].to_numpy()
+        
+        # Rows are grouped contiguously by (product, location)
+        bounds = np.flatnonzero(np.diff(groups)) + 1
+        group_start = np.concatenate(([0], bounds))
+        group_end = np.concatenate((bounds, [len(df)]))
+        
+        purchase, sale, units, remaining, fulfilled = match_groups(group_start, group_end, qtys)
+        
+        shortfall = -np.minimum(qtys, 0) - fulfilled
+        for i in np.flatnonzero(shortfall):
+            key = (int(products[i]), int(locations[i]))
+            self._shortages[key] = self._shortages.get(key, 0) + int(shortfall[i])
+        self._report_shortages()
+        
+        # Record the sales chronologically, as the deque engine does; the stable
+        # sort keeps each sale's lots in FIFO order
+        order = np.argsort(rows[sale], kind='stable')
+        purchase, sale, units = purchase[order], sale[order], units[order]
+        
+        self._extend_shelf_time_records(
+            product=products[sale],
+            location=locations[sale],
+            purchase_date=dates[purchase],
+            sale_date=dates[sale],
+            shelf_time_days=days_between(dates[sale], dates[purchase]),
+            unit_cost=costs[purchase] / qtys[purchase],
+            purchase_reason=reasons[purchase],
+            sale_reason=reasons[sale],
+            units=units
+        )
+        
+        # Stock keys in the order the deque engine creates them: by first receipt
+        receipts = np.flatnonzero(qtys > 0)
+        _, first = np.unique(groups[receipts], return_index=True)
+        for i in receipts[first[np.argsort(rows[receipts[first]])]]:
+            key = (int(products[i]), int(locations[i]))
+            self.current_stock[key] = deque()
+            self._stock_totals[key] = [0, 0.0]
+        
+        # Whatever has not been sold stays on the shelf
+        for i in np.flatnonzero(remaining > 0):
+            key = (int(products[i]), int(locations[i]))
+            stock_queue = self.current_stock[key]
+            if stock_queue and dates[i] < stock_queue[-1][0]:
+                self._unordered_stock.add(key)
+            unit_cost = costs[i] / qtys[i]
+            stock_queue.append([int(dates[i]), unit_cost, int(reasons[i]), int(remaining[i])])
+            totals = self._stock_totals[key]
+            totals[0] += int(remaining[i])
+            totals[1] += unit_cost * remaining[i]
+    
+    def _fifo_movements(self):
+        """
+        Transactions in FIFO processing order, grouped by product and location
+        codes, with lots already on hand (e.g. opening stock) ahead of each
+        group's rows, and each row's position before grouping in 'row'. The lots
+        are moved out of current_stock
+        """
+        df = pd.DataFrame({
+            'product': self.df['Primary SKU'].cat.codes.astype(np.int64),
+            'location': self.df['Location'].cat.codes.astype(np.int64),
+            'date': self.df['DateTime'].to_numpy('datetime64[ns]').view('i8'),
+            'cost': self._fifo_costs,
+            'reason': self.df['Adj. reason'].cat.codes.astype(np.int64),
+            'qty': self.df['Qty.']
+        })
+        
+        on_hand = [
+            (product, location, date, unit_cost * qty, reason, qty)
+            for (product, location), stock_queue in self.current_stock.items()
+            for date, unit_cost, reason, qty in stock_queue
+        ]
+        self.current_stock.clear()
+        self._stock_totals.clear()
+        self._unordered_stock.clear()
+        if on_hand:
+            df = pd.concat([pd.DataFrame(on_hand, columns=df.columns), df], ignore_index=True)
+        
+        df['row'] = np.arange(len(df))
+        
+        # Codes start at -1 (missing), so shift both before packing them into one key
+        df['group'] = (df['product'] + 1) * (len(self._location_cats) + 1) + df['location'] + 1
+        
+        return df.iloc[np.argsort(df['group'].to_numpy(), kind='stable')].reset_index(drop=True)
+    
+    def _category_code(self, attr, label):
+        """
+        Code of label within the categories stored in attribute attr,
+        registering labels that never appear in the transactions
+        """
+        categories = getattr(self, attr)
+        if label not in categories:
+            categories = categories.append(pd.Index([label]))
+            setattr(self, attr, categories)
+        return categories.get_loc(label)
+    
+    def _stock_key(self, product, location):
+        """
+        current_stock key (SKU code, location code) for a product and location name
+        """
+        return self._category_code('_sku_cats', product), self._category_code('_location_cats', location)
+    
+    @staticmethod
+    def _label(categories, code):
+        """
+        Label for a category code (code -1 is a missing value)
+        """
+        return categories[code] if code >= 0 else np.nan
+    
+    def _stock_labels(self, product, location):
+        """
+        Product and location names for a current_stock key
+        """
+        return self._label(self._sku_cats, product), self._label(self._location_cats, location)
+    
+    def _stock_lots(self):
+        """
+        Lots currently on hand as columns (FIFO order within each product and
+        location), with how many whole days each has been on the shelf
+        """
+        return self._cached('stock_lots', self._build_stock_lots)
+    
+    def _build_stock_lots(self):
+        lots = pd.DataFrame(
+            [(product, location, date, unit_cost, reason, qty)
+             for (product, location), stock_queue in self.current_stock.items()
+             for date, unit_cost, reason, qty in stock_queue],
+            columns=['product', 'location', 'purchase_date', 'unit_cost', 'reason', 'units']
+        )
+        purchase_i8 = lots['purchase_date'].to_numpy(np.int64)
+        lots['purchase_date'] = purchase_i8.view('datetime64[ns]')
+        lots['days_on_shelf'] = days_between(self._now_i8, purchase_i8).astype(np.int32)
+        return lots
+    
+    def _reset_shelf_time_records(self, capacity=1024):
+        """
+        Allocate empty columnar buffers for shelf time records
+        """
+        self._shelf_time_columns = {
+            name: np.empty(capacity, dtype=dtype) for name, dtype in SHELF_TIME_COLUMNS.items()
+        }
+        self._st_len = 0
+    
+    def _reserve_shelf_time_records(self, count):
+        """
+        Make room for count more shelf time records, doubling the buffers when full
+        """
+        needed = self._st_len + count
+        capacity = len(self._shelf_time_columns['units'])
+        if needed <= capacity:
+            return
+        
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._shelf_time_columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._st_len] = column[:self._st_len]
+            self._shelf_time_columns[name] = grown
+    
+    def _flush_shelf_time_records(self):
+        """
+        Move the shelf time records collected by _remove_stock into the columnar
+        buffers, computing shelf times for all of them at once
+        """
+        if not self._pending_shelf_time:
+            return
+        
+        product, location, purchase_date, sale_date, unit_cost, purchase_reason, sale_reason, units = (
+            np.array(column) for column in zip(*self._pending_shelf_time)
+        )
+        self._pending_shelf_time.clear()
+        self._extend_shelf_time_records(
+            product=product,
+            location=location,
+            purchase_date=purchase_date,
+            sale_date=sale_date,
+            shelf_time_days=days_between(sale_date, purchase_date),
+            unit_cost=unit_cost,
+            purchase_reason=purchase_reason,
+            sale_reason=sale_reason,
+            units=units
+        )
+    
+    def _extend_shelf_time_records(self, **arrays):
+        """
+        Append a batch of shelf time records given as one array per column
+        """
+        count = len(arrays['units'])
+        self._reserve_shelf_time_records(count)
+        for name, values in arrays.items():
+            self._shelf_time_columns[name][self._st_len:self._st_len + count] = values
+        self._st_len += count
                 
     def _add_stock(self, product, location, date, qty, cost, reason):
         """
-        Add stock to inventory (FIFO queue)
+        Add stock to inventory (FIFO queue); product and location are category
+        codes and date is in nanoseconds since the epoch
         """
-        # Add individual units to maintain granular tracking
-        unit_cost = cost / qty if qty > 0 else 0
+        # Keep one lot per receipt; units are drawn from it in _remove_stock.
+        # A receipt of no units adds nothing to draw from
+        if qty <= 0:
+            return
+        unit_cost = cost / qty
         
-        for _ in range(qty):
-            self.current_stock[product][location].append({
-                'date': date,
-                'cost': unit_cost,
-                'reason': reason
-            })
+        key = (product, location)
+        stock_queue = self.current_stock.get(key)
+        if stock_queue is None:
+            stock_queue = self.current_stock[key] = deque()
+            self._stock_totals[key] = [0, 0.0]
+        elif stock_queue and date < stock_queue[-1][0]:
+            self._unordered_stock.add(key)
+        stock_queue.append([date, unit_cost, reason, qty])
+        totals = self._stock_totals[key]
+        totals[0] += qty
+        totals[1] += unit_cost * qty
             
     def _remove_stock(self, product, location, date, qty, reason):
         """
         Remove stock from inventory using FIFO logic and calculate shelf time
         """
-        removed_qty = 0
+        key = (product, location)
+        # An unknown key has no stock; don't create an empty queue for it
+        stock_queue = self.current_stock.get(key)
+        pending = self._pending_shelf_time
         
-        while removed_qty < qty and self.current_stock[product][location]:
-            # Get the oldest stock (FIFO)
-            oldest_stock = self.current_stock[product][location].popleft()
+        # Usual case: the oldest lot covers the whole sale
+        if stock_queue and stock_queue[0][3] >= qty:
+            oldest_lot = stock_queue[0]
+            pending.append((product, location, oldest_lot[0], date, oldest_lot[1], oldest_lot[2], reason, qty))
+            oldest_lot[3] -= qty
+            if oldest_lot[3] == 0:
+                stock_queue.popleft()
+            totals = self._stock_totals[key]
+            totals[0] -= qty
+            # An emptied key starts again from zero rather than carry rounding drift
+            totals[1] = totals[1] - qty * oldest_lot[1] if stock_queue else 0.0
+            return
+        
+        remaining = qty
+        removed_cost = 0.0
+        
+        # Drain whole lots (FIFO) until the sale is covered or the stock runs out
+        while remaining and stock_queue:
+            oldest_lot = stock_queue[0]
+            take = min(remaining, oldest_lot[3])
             
-            # Calculate shelf time
-            shelf_time_days = (date - oldest_stock['date']).days
+            # Record the sale once for all units taken from this lot; shelf times
+            # are computed in bulk by _flush_shelf_time_records
+            pending.append((product, location, oldest_lot[0], date, oldest_lot[1], oldest_lot[2], reason, take))
             
-            # Record the shelf time
-            self.shelf_time_records.append({
-                'product': product,
-                'location': location,
-                'purchase_date': oldest_stock['date'],
-                'sale_date': date,
-                'shelf_time_days': shelf_time_days,
-                'unit_cost': oldest_stock['cost'],
-                'purchase_reason': oldest_stock['reason'],
-                'sale_reason': reason
-            })
+            oldest_lot[3] -= take
+            if oldest_lot[3] == 0:
+                stock_queue.popleft()
             
-            removed_qty += 1
+            remaining -= take
+            removed_cost += take * oldest_lot[1]
+        
+        if remaining < qty:
+            totals = self._stock_totals[key]
+            totals[0] -= qty - remaining
+            totals[1] = totals[1] - removed_cost if stock_queue else 0.0
             
-        if removed_qty < qty:
-            print(f"Warning: Tried to remove {qty} units of {product} at {location}, but only {removed_qty} were available")
+        if remaining:
+            # Reported once, after all movements are processed
+            self._shortages[key] = self._shortages.get(key, 0) + remaining
+    
+    def _report_shortages(self):
+        """
+        Print one summary of the units that were sold without stock on hand
+        """
+        if not self._shortages:
+            return
+        
+        lines = [f"Warning: {len(self._shortages)} product/location combinations sold more units than were in stock "
+                 f"({sum(self._shortages.values())} units had no matching purchase):"]
+        for key, units in self._shortages.items():
+            product, location = self._stock_labels(*key)
+            lines.append(f"  {product} at {location}: {units} units")
+        sys.stdout.write("\n".join(lines) + "\n")
+    
+    def _cached(self, name, build):
+        """
+        Return build()'s result, computing it only once until stock next changes
+        """
+        if name not in self._report_cache:
+            self._report_cache[name] = build()
+        return self._report_cache[name]
     
     def generate_analytics(self):
         """
         Generate comprehensive analytics from shelf time data
         """
-        if not self.shelf_time_records:
+        return self._cached('analytics', self._generate_analytics)
+    
+    def _generate_analytics(self):
+        if self._st_len == 0:
             print("No shelf time records found.")
             print("This likely means sales are occurring before purchases in your dataset.")
             print("You may need historical purchase data or starting inventory levels.")
@@ -180,43 +846,62 @@ class InventoryAnalyzer:
                 'monthly_trends': pd.DataFrame()
             }, pd.DataFrame()
             
-        shelf_df = pd.DataFrame(self.shelf_time_records)
+        # One row per lot a sale drew from; statistics are weighted by its units
+        # The filled part of each buffer becomes a column as-is; records are only
+        # ever appended past _st_len, so the frame never sees later writes
+        shelf_df = pd.DataFrame({name: column[:self._st_len] for name, column in self._shelf_time_columns.items()},
+                                copy=False)
+        days = shelf_df['shelf_time_days'].to_numpy(np.int64)
+        units = shelf_df['units'].to_numpy(np.int64)
+        unit_cost = shelf_df['unit_cost'].to_numpy()
+        product_codes = shelf_df['product'].to_numpy(np.int64)
+        location_codes = shelf_df['location'].to_numpy(np.int64)
+        
+        shelf_df['product'] = pd.Categorical.from_codes(shelf_df['product'], self._sku_cats)
+        shelf_df['location'] = pd.Categorical.from_codes(shelf_df['location'], self._location_cats)
+        shelf_df['purchase_reason'] = pd.Categorical.from_codes(shelf_df['purchase_reason'], self._reason_cats)
+        shelf_df['sale_reason'] = pd.Categorical.from_codes(shelf_df['sale_reason'], self._reason_cats)
+        shelf_df['purchase_date'] = shelf_df['purchase_date'].to_numpy().view('datetime64[ns]')
+        shelf_df['sale_date'] = shelf_df['sale_date'].to_numpy().view('datetime64[ns]')
         
         analytics = {}
         
-        # Overall statistics
+        # Overall statistics, as plain NumPy reductions over a single group
+        _, overall = _weighted_shelf_time_arrays(np.zeros(len(days), dtype=np.int8), days, units, unit_cost)
         analytics['overall'] = {
-            'total_units_sold': len(shelf_df),
-            'average_shelf_time_days': shelf_df['shelf_time_days'].mean(),
-            'median_shelf_time_days': shelf_df['shelf_time_days'].median(),
-            'min_shelf_time_days': shelf_df['shelf_time_days'].min(),
-            'max_shelf_time_days': shelf_df['shelf_time_days'].max(),
-            'std_shelf_time_days': shelf_df['shelf_time_days'].std()
+            'total_units_sold': int(overall['count'][0]),
+            'average_shelf_time_days': float(overall['mean_days'][0]),
+            'median_shelf_time_days': float(overall['median_days'][0]),
+            'min_shelf_time_days': int(overall['min_days'][0]),
+            'max_shelf_time_days': int(overall['max_days'][0]),
+            'std_shelf_time_days': float(overall['std_days'][0])
         }
         
-        # By product analysis
-        analytics['by_product'] = shelf_df.groupby('product').agg({
-            'shelf_time_days': ['count', 'mean', 'median', 'min', 'max', 'std'],
-            'unit_cost': 'mean'
-        }).round(2)
-        
-        # By location analysis
-        analytics['by_location'] = shelf_df.groupby('location').agg({
-            'shelf_time_days': ['count', 'mean', 'median', 'min', 'max', 'std'],
-            'unit_cost': 'mean'
-        }).round(2)
+        # By product and by location analysis; flat columns, and rounding is
+        # left to whoever displays the numbers. Missing codes (-1) are dropped
+        shelf_time_stats = ['count', 'mean_days', 'median_days', 'min_days', 'max_days', 'std_days', 'mean_unit_cost']
+        for name, codes, categories in [('product', product_codes, self._sku_cats),
+                                        ('location', location_codes, self._location_cats)]:
+            known = codes >= 0
+            stats = weighted_shelf_time_stats(codes[known], days[known], units[known], unit_cost[known])
+            stats.index = pd.CategoricalIndex(pd.Categorical.from_codes(stats.index, categories), name=name)
+            analytics[f'by_{name}'] = stats[shelf_time_stats]
         
-        # Fast vs slow moving products
-        product_avg_shelf_time = shelf_df.groupby('product')['shelf_time_days'].mean().sort_values()
+        # Fast vs slow moving products (reusing the per-product means)
+        product_avg_shelf_time = analytics['by_product']['mean_days'].sort_values()
         analytics['fast_moving_products'] = product_avg_shelf_time.head(10)
         analytics['slow_moving_products'] = product_avg_shelf_time.tail(10)
         
-        # Monthly trends
-        shelf_df['sale_month'] = shelf_df['sale_date'].dt.to_period('M')
-        analytics['monthly_trends'] = shelf_df.groupby('sale_month').agg({
-            'shelf_time_days': ['count', 'mean'],
-            'unit_cost': 'sum'
-        }).round(2)
+        # Monthly trends, grouped on int32 month numbers (months since 1970-01,
+        # which are also the ordinals of monthly Periods); Periods are only
+        # built for the output columns
+        months = shelf_df['sale_date'].to_numpy().astype('datetime64[M]').view(np.int64).astype(np.int32)
+        shelf_df['sale_month'] = pd.arrays.PeriodArray(months.astype(np.int64), dtype=pd.PeriodDtype('M'))
+        monthly = weighted_shelf_time_stats(months, days, units, unit_cost)
+        monthly.index = pd.PeriodIndex(pd.arrays.PeriodArray(monthly.index.to_numpy(np.int64), dtype=pd.PeriodDtype('M')),
+                                       name='sale_month')
+        analytics['monthly_trends'] = monthly.rename(columns={'count': 'units_sold'})[
+            ['units_sold', 'mean_days', 'total_cost']]
         
         return analytics, shelf_df
     
@@ -224,33 +909,36 @@ class InventoryAnalyzer:
         """
         Get summary of current stock on hand
         """
-        current_stock_summary = []
-        
-        for product in self.current_stock:
-            for location in self.current_stock[product]:
-                stock_queue = self.current_stock[product][location]
-                if stock_queue:  # If there's stock remaining
-                    qty = len(stock_queue)
-                    oldest_date = min(item['date'] for item in stock_queue)
-                    newest_date = max(item['date'] for item in stock_queue)
-                    total_cost = sum(item['cost'] for item in stock_queue)
-                    avg_cost = total_cost / qty if qty > 0 else 0
-                    
-                    # Calculate how long the oldest stock has been sitting
-                    days_on_shelf = (datetime.now() - oldest_date).days
-                    
-                    current_stock_summary.append({
-                        'product': product,
-                        'location': location,
-                        'current_qty': qty,
-                        'oldest_stock_date': oldest_date,
-                        'newest_stock_date': newest_date,
-                        'days_on_shelf_oldest': days_on_shelf,
-                        'total_cost': total_cost,
-                        'avg_cost_per_unit': avg_cost
-                    })
-        
-        return pd.DataFrame(current_stock_summary)
+        # One row of running totals per stocked product/location; everything
+        # derived from them is computed per column
+        rows = []
+        for key, stock_queue in self.current_stock.items():
+            if stock_queue:  # If there's stock remaining
+                # Lots received in date order have the oldest at the head of the queue
+                if key in self._unordered_stock:
+                    oldest_ns = min(lot[0] for lot in stock_queue)
+                    newest_ns = max(lot[0] for lot in stock_queue)
+                else:
+                    oldest_ns, newest_ns = stock_queue[0][0], stock_queue[-1][0]
+                rows.append((*key, *self._stock_totals[key], oldest_ns, newest_ns))
+        
+        if not rows:
+            return pd.DataFrame()
+        
+        product, location, qty, total_cost, oldest_ns, newest_ns = (np.array(column) for column in zip(*rows))
+        total_cost = total_cost.astype(np.float64)
+        
+        return pd.DataFrame({
+            'product': pd.Categorical.from_codes(product, self._sku_cats),
+            'location': pd.Categorical.from_codes(location, self._location_cats),
+            'current_qty': qty.astype(np.int64),
+            'oldest_stock_date': oldest_ns.astype(np.int64).view('datetime64[ns]'),
+            'newest_stock_date': newest_ns.astype(np.int64).view('datetime64[ns]'),
+            # How long the oldest stock has been sitting
+            'days_on_shelf_oldest': days_between(self._now_i8, oldest_ns).astype(np.int32),
+            'total_cost': total_cost,
+            'avg_cost_per_unit': np.divide(total_cost, qty, out=np.zeros(len(qty)), where=qty > 0)
+        })
     
     def add_opening_stock(self, opening_stock_data):
         """
@@ -259,15 +947,17 @@ class InventoryAnalyzer:
         ['product', 'location', 'qty', 'date', 'cost_per_unit']
         """
         print("Adding opening stock data...")
+        self._report_cache.clear()
         
         for stock_item in opening_stock_data:
             product = stock_item['product']
             location = stock_item['location']
             qty = stock_item['qty']
-            date = pd.to_datetime(stock_item['date'])
+            date = pd.to_datetime(stock_item['date']).value
             cost = stock_item.get('cost_per_unit', 0)
             
-            self._add_stock(product, location, date, qty, cost * qty, "Opening Stock")
+            self._add_stock(*self._stock_key(product, location), date, qty, cost * qty,
+                            self._category_code('_reason_cats', "Opening Stock"))
             
         print(f"Added opening stock for {len(opening_stock_data)} items")
         
@@ -308,145 +998,219 @@ class InventoryAnalyzer:
         print("="*60)
         
         # Transaction summary
-        purchases = self.df[self.df['Qty.'] > 0]
-        sales = self.df[self.df['Qty.'] < 0]
+        qtys = self.df['Qty.'].to_numpy(np.int64)
+        purchases_mask = qtys > 0
+        sales_mask = qtys < 0
         
         print(f"\nTRANSACTION OVERVIEW:")
         print(f"Total transactions: {len(self.df)}")
-        print(f"Purchase transactions: {len(purchases)} (Total qty: {purchases['Qty.'].sum()})")
-        print(f"Sale transactions: {len(sales)} (Total qty: {abs(sales['Qty.'].sum())})")
+        print(f"Purchase transactions: {purchases_mask.sum()} (Total qty: {qtys[purchases_mask].sum()})")
+        print(f"Sale transactions: {sales_mask.sum()} (Total qty: {abs(qtys[sales_mask].sum())})")
+        
+        # Only positive costs (purchases) count towards the cost totals
+        totals = pd.DataFrame({
+            'Primary SKU': self.df['Primary SKU'],
+            'Location': self.df['Location'],
+            'Qty.': self.df['Qty.'],
+            'Cost': self.df['Cost'].clip(lower=0)
+        })
         
         # Product summary
         print(f"\nPRODUCT SUMMARY:")
-        product_summary = self.df.groupby('Primary SKU').agg({
-            'Qty.': 'sum',
-            'Cost': lambda x: x[x > 0].sum()  # Only positive costs (purchases)
-        }).round(2)
+        product_summary = totals.groupby('Primary SKU', observed=True).agg(
+            **{'Qty.': ('Qty.', 'sum'), 'Cost': ('Cost', 'sum')})
         
-        print(product_summary)
+        # Round only for display
+        with pd.option_context('display.float_format', '{:.2f}'.format):
+            print(product_summary)
         
         # Location summary
         print(f"\nLOCATION SUMMARY:")
-        location_summary = self.df.groupby('Location').agg({
-            'Qty.': 'sum',
-            'Cost': lambda x: x[x > 0].sum()
-        }).round(2)
+        location_summary = totals.groupby('Location', observed=True).agg(
+            **{'Qty.': ('Qty.', 'sum'), 'Cost': ('Cost', 'sum')})
         
-        print(location_summary)
+        with pd.option_context('display.float_format', '{:.2f}'.format):
+            print(location_summary)
         
-    def get_detailed_shelf_aging_report(self):
+    def get_detailed_shelf_aging_report(self, verbose=False, out_path=None):
         """
-        Get detailed report of how long each product has been sitting on shelf at each location
+        Get detailed report of how long each product has been sitting on shelf at each location.
+        Prints one line per purchase lot, or one per unit when verbose.
+        With out_path, the per-unit rows are streamed to that CSV file as each
+        product/location is visited and the number of rows written is returned
+        instead of a DataFrame
         """
-        current_date = datetime.now()
-        shelf_aging_report = []
+        # The lots snapshot is shared with the other reports; add columns to a new frame
+        lots = self._stock_lots()
+        lots = lots.assign(purchased=lots['purchase_date'].dt.strftime('%Y-%m-%d %H:%M'))
         
-        print("\n" + "="*80)
-        print("DETAILED SHELF AGING REPORT")
-        print("="*80)
-        print(f"Analysis as of: {current_date.strftime('%Y-%m-%d %H:%M')}")
-        print("="*80)
+        writer = None
+        if out_path is not None and len(lots):
+            lots['purchase_timestamp'] = lots['purchase_date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            out_file = open(out_path, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+            writer = csv.writer(out_file, lineterminator=os.linesep)
+            writer.writerow(DETAILED_AGING_COLUMNS)
+        
+        # Collect the report and write it in one go rather than a print per line
+        lines = [
+            "\n" + "="*80,
+            "DETAILED SHELF AGING REPORT",
+            "="*80,
+            f"Analysis as of: {self._now.strftime('%Y-%m-%d %H:%M')}",
+            "="*80
+        ]
+        
+        try:
+            for (product, location), group in lots.groupby(['product', 'location'], sort=False):
+                product, location = self._stock_labels(product, location)
+                
+                lines.append(f"\nPRODUCT: {product}")
+                lines.append(f"LOCATION: {location}")
+                lines.append("-" * 60)
+                
+                units = group['units'].to_numpy()
+                days = group['days_on_shelf'].to_numpy()
+                costs = group['unit_cost'].to_numpy()
+                
+                # Analyze each lot in the queue (FIFO order)
+                unit_number = 0
+                lot_rows = zip(group['purchased'], days, costs, units)
+                for lot_number, (purchased, days_on_shelf, unit_cost, lot_qty) in enumerate(lot_rows, 1):
+                    if verbose:
+                        for i in range(unit_number + 1, unit_number + lot_qty + 1):
+                            lines.append(f"  Unit {i:2d}: Purchased on {purchased} "
+                                         f"→ {days_on_shelf:3d} days on shelf (₹{unit_cost:.0f})")
+                    else:
+                        lines.append(f"  Lot {lot_number:2d}: {lot_qty} units purchased on {purchased} "
+                                     f"→ {days_on_shelf:3d} days on shelf (₹{unit_cost:.0f} each)")
+                    unit_number += lot_qty
+                
+                if writer is not None:
+                    self._write_shelf_aging_rows(writer, product, location, group)
+                
+                total_units = units.sum()
+                total_value = (costs * units).sum()
+                avg_days_on_shelf = (days * units).sum() / total_units
+                
+                lines.append(f"  {'='*58}")
+                lines.append(f"  SUMMARY - Total Units: {total_units}, Total Value: ₹{total_value:.0f}")
+                lines.append(f"  Average days on shelf: {avg_days_on_shelf:.1f} days")
+                lines.append(f"  Oldest stock: {days.max()} days, Newest stock: {days.min()} days")
+        finally:
+            if writer is not None:
+                out_file.close()
         
-        for product in self.current_stock:
-            for location in self.current_stock[product]:
-                stock_queue = self.current_stock[product][location]
-                if stock_queue:  # If there's stock remaining
-                    
-                    print(f"\nPRODUCT: {product}")
-                    print(f"LOCATION: {location}")
-                    print("-" * 60)
-                    
-                    # Analyze each unit in the queue (FIFO order)
-                    total_units = len(stock_queue)
-                    total_days_aging = 0
-                    
-                    for i, stock_item in enumerate(stock_queue, 1):
-                        purchase_date = stock_item['date']
-                        days_on_shelf = (current_date - purchase_date).days
-                        total_days_aging += days_on_shelf
-                        
-                        print(f"  Unit {i:2d}: Purchased on {purchase_date.strftime('%Y-%m-%d %H:%M')} "
-                              f"→ {days_on_shelf:3d} days on shelf (₹{stock_item['cost']:.0f})")
-                        
-                        # Add to detailed report
-                        shelf_aging_report.append({
-                            'product': product,
-                            'location': location,
-                            'unit_number': i,
-                            'purchase_date': purchase_date,
-                            'days_on_shelf': days_on_shelf,
-                            'unit_cost': stock_item['cost'],
-                            'purchase_reason': stock_item['reason']
-                        })
-                    
-                    avg_days_on_shelf = total_days_aging / total_units
-                    oldest_days = max((current_date - item['date']).days for item in stock_queue)
-                    newest_days = min((current_date - item['date']).days for item in stock_queue)
-                    total_value = sum(item['cost'] for item in stock_queue)
-                    
-                    print(f"  {'='*58}")
-                    print(f"  SUMMARY - Total Units: {total_units}, Total Value: ₹{total_value:.0f}")
-                    print(f"  Average days on shelf: {avg_days_on_shelf:.1f} days")
-                    print(f"  Oldest stock: {oldest_days} days, Newest stock: {newest_days} days")
-        
-        return pd.DataFrame(shelf_aging_report)
+        sys.stdout.write("\n".join(lines) + "\n")
+        
+        if out_path is not None:
+            return int(lots['units'].sum())
+        
+        # One row per unit on the shelf
+        units = lots.loc[lots.index.repeat(lots['units'])].reset_index(drop=True)
+        return pd.DataFrame({
+            'product': pd.Categorical.from_codes(units['product'], self._sku_cats),
+            'location': pd.Categorical.from_codes(units['location'], self._location_cats),
+            'unit_number': units.groupby(['product', 'location'], sort=False).cumcount() + 1,
+            'purchase_date': units['purchase_date'],
+            'days_on_shelf': units['days_on_shelf'],
+            'unit_cost': units['unit_cost'],
+            'purchase_reason': pd.Categorical.from_codes(units['reason'], self._reason_cats)
+        })
+    
+    def _write_shelf_aging_rows(self, writer, product, location, group):
+        """
+        Write one detailed shelf aging CSV row per unit in a product/location's lots
+        """
+        # csv writes None as an empty field, matching how missing labels are saved elsewhere
+        product = None if pd.isna(product) else product
+        location = None if pd.isna(location) else location
+        
+        unit_number = 0
+        lot_rows = zip(group['purchase_timestamp'], group['days_on_shelf'].tolist(),
+                       group['unit_cost'].tolist(), group['reason'].tolist(), group['units'].tolist())
+        for purchase_date, days_on_shelf, unit_cost, reason, lot_qty in lot_rows:
+            reason = self._reason_cats[reason] if reason >= 0 else None
+            writer.writerows(
+                (product, location, i, purchase_date, days_on_shelf, unit_cost, reason)
+                for i in range(unit_number + 1, unit_number + lot_qty + 1)
+            )
+            unit_number += lot_qty
+    
+    def _aging_items(self):
+        """
+        Stock on hand with its aging category as one frame, bucketed in a single
+        np.digitize pass and ordered by category (FIFO order within each)
+        """
+        lots = self._stock_lots()
+        buckets = np.digitize(lots['days_on_shelf'].to_numpy(), AGING_BINS)
+        order = np.argsort(buckets, kind='stable')
+        
+        return pd.DataFrame({
+            'category': pd.Categorical.from_codes(buckets[order], AGING_CATEGORIES),
+            'product': pd.Categorical.from_codes(lots['product'].to_numpy()[order], self._sku_cats),
+            'location': pd.Categorical.from_codes(lots['location'].to_numpy()[order], self._location_cats),
+            'days_on_shelf': lots['days_on_shelf'].to_numpy()[order],
+            'cost': lots['unit_cost'].to_numpy()[order],
+            'units': lots['units'].to_numpy()[order],
+            'purchase_date': lots['purchase_date'].to_numpy()[order]
+        })
     
     def get_aging_summary_by_categories(self):
         """
-        Categorize stock by aging periods
+        Categorize stock by aging periods; each row is a lot, with its size in 'units'
         """
-        current_date = datetime.now()
-        aging_categories = {
-            'Fresh (0-7 days)': [],
-            'Medium (8-30 days)': [],
-            'Aged (31-90 days)': [],
-            'Very Aged (90+ days)': []
-        }
+        items = self._aging_items()
+        codes = items['category'].cat.codes.to_numpy()
+        return {category: items[codes == i].drop(columns='category') for i, category in enumerate(AGING_CATEGORIES)}
+    
+    def get_aging_category_totals(self):
+        """
+        Units, value and average age of the stock in each aging category
+        """
+        lots = self._stock_lots()
+        units = lots['units'].to_numpy(np.int64)
+        days = lots['days_on_shelf'].to_numpy(np.int64)
+        costs = lots['unit_cost'].to_numpy(np.float64)
         
-        for product in self.current_stock:
-            for location in self.current_stock[product]:
-                stock_queue = self.current_stock[product][location]
-                for stock_item in stock_queue:
-                    days_on_shelf = (current_date - stock_item['date']).days
-                    
-                    item_info = {
-                        'product': product,
-                        'location': location,
-                        'days_on_shelf': days_on_shelf,
-                        'cost': stock_item['cost'],
-                        'purchase_date': stock_item['date']
-                    }
-                    
-                    if days_on_shelf <= 7:
-                        aging_categories['Fresh (0-7 days)'].append(item_info)
-                    elif days_on_shelf <= 30:
-                        aging_categories['Medium (8-30 days)'].append(item_info)
-                    elif days_on_shelf <= 90:
-                        aging_categories['Aged (31-90 days)'].append(item_info)
-                    else:
-                        aging_categories['Very Aged (90+ days)'].append(item_info)
+        buckets = np.digitize(days, AGING_BINS)
+        size = len(AGING_CATEGORIES)
+        category_units = np.bincount(buckets, weights=units, minlength=size).astype(np.int64)
+        category_value = np.bincount(buckets, weights=costs * units, minlength=size)
+        category_days = np.bincount(buckets, weights=days * units, minlength=size)
         
-        return aging_categories
+        return pd.DataFrame({
+            'units': category_units,
+            'total_value': category_value,
+            'avg_days_on_shelf': category_days / np.maximum(category_units, 1)
+        }, index=pd.Index(AGING_CATEGORIES, name='category'))
     
-    def print_aging_summary(self, aging_categories):
+    def print_aging_summary(self, aging_totals):
         """
-        Print summary of aging categories
+        Print summary of aging categories, from get_aging_category_totals or the
+        per-category lots of get_aging_summary_by_categories
         """
-        print("\n" + "="*60)
-        print("STOCK AGING CATEGORY SUMMARY")
-        print("="*60)
+        if isinstance(aging_totals, dict):
+            aging_totals = pd.DataFrame.from_dict({
+                category: {
+                    'units': items['units'].sum(),
+                    'total_value': (items['cost'] * items['units']).sum(),
+                    'avg_days_on_shelf': (items['days_on_shelf'] * items['units']).sum() / max(items['units'].sum(), 1)
+                }
+                for category, items in aging_totals.items()
+            }, orient='index')
+        
+        lines = ["\n" + "="*60, "STOCK AGING CATEGORY SUMMARY", "="*60]
+        
+        for category, totals in aging_totals.iterrows():
+            lines.append(f"\n{category}:")
+            lines.append(f"  Units: {totals['units']:.0f}")
+            lines.append(f"  Total Value: ₹{totals['total_value']:.2f}")
+            if totals['units'] > 0:
+                lines.append(f"  Average Days on Shelf: {totals['avg_days_on_shelf']:.1f}")
         
-        for category, items in aging_categories.items():
-            total_units = len(items)
-            total_value = sum(item['cost'] for item in items)
-            print(f"\n{category}:")
-            print(f"  Units: {total_units}")
-            print(f"  Total Value: ₹{total_value:.2f}")
-            if total_units > 0:
-                avg_days = sum(item['days_on_shelf'] for item in items) / total_units
-                print(f"  Average Days on Shelf: {avg_days:.1f}")
+        sys.stdout.write("\n".join(lines) + "\n")
     
-    def save_all_reports_to_csv(self):
+    def save_all_reports_to_csv(self, verbose=False):
         """
         Save all analysis reports to CSV files in the working directory
         """
@@ -458,64 +1222,45 @@ class InventoryAnalyzer:
         current_dir = os.getcwd()
         
         # 1. Save detailed shelf aging report
-        shelf_aging_df = self.get_detailed_shelf_aging_report()
-        if not shelf_aging_df.empty:
-            aging_file = os.path.join(current_dir, 'detailed_shelf_aging.csv')
-            shelf_aging_df.to_csv(aging_file, index=False)
+        aging_file = os.path.join(current_dir, 'detailed_shelf_aging.csv')
+        if self.get_detailed_shelf_aging_report(verbose=verbose, out_path=aging_file):
             print(f"✓ Detailed shelf aging report saved: {aging_file}")
         
         # 2. Save current stock summary
         current_stock_df = self.get_current_stock_summary()
         if not current_stock_df.empty:
             stock_file = os.path.join(current_dir, 'current_stock_summary.csv')
-            current_stock_df.to_csv(stock_file, index=False)
+            write_csv(current_stock_df, stock_file)
             print(f"✓ Current stock summary saved: {stock_file}")
         
         # 3. Save aging categories summary
-        aging_categories = self.get_aging_summary_by_categories()
-        aging_summary_data = []
-        
-        for category, items in aging_categories.items():
-            for item in items:
-                aging_summary_data.append({
-                    'category': category,
-                    'product': item['product'],
-                    'location': item['location'],
-                    'days_on_shelf': item['days_on_shelf'],
-                    'cost': item['cost'],
-                    'purchase_date': item['purchase_date']
-                })
-        
-        if aging_summary_data:
-            aging_summary_df = pd.DataFrame(aging_summary_data)
+        aging_summary_df = self._aging_items()
+        
+        if not aging_summary_df.empty:
             aging_categories_file = os.path.join(current_dir, 'aging_categories_summary.csv')
-            aging_summary_df.to_csv(aging_categories_file, index=False)
+            write_csv(aging_summary_df, aging_categories_file)
             print(f"✓ Aging categories summary saved: {aging_categories_file}")
         
         # 4. Save shelf time analysis (if available)
         analytics, shelf_time_df = self.generate_analytics()
         if not shelf_time_df.empty:
             shelf_time_file = os.path.join(current_dir, 'shelf_time_analysis.csv')
-            shelf_time_df.to_csv(shelf_time_file, index=False)
+            write_csv(shelf_time_df, shelf_time_file)
             print(f"✓ Shelf time analysis saved: {shelf_time_file}")
         
         # 5. Save transaction summary
-        transaction_summary = []
-        for idx, row in self.df.iterrows():
-            transaction_summary.append({
-                'date': row['DateTime'],
-                'product': row['Primary SKU'],
-                'location': row['Location'],
-                'quantity': row['Qty.'],
-                'cost': row['Cost'],
-                'reason': row['Adj. reason'],
-                'transaction_type': 'Purchase' if row['Qty.'] > 0 else 'Sale'
+        if not self.df.empty:
+            transaction_df = pd.DataFrame({
+                'date': self.df['DateTime'],
+                'product': self.df['Primary SKU'],
+                'location': self.df['Location'],
+                'quantity': self.df['Qty.'],
+                'cost': self.df['Cost'],
+                'reason': self.df['Adj. reason'],
+                'transaction_type': np.where(self.df['Qty.'].to_numpy(np.int64) > 0, 'Purchase', 'Sale')
             })
-        
-        if transaction_summary:
-            transaction_df = pd.DataFrame(transaction_summary)
             transaction_file = os.path.join(current_dir, 'transaction_summary.csv')
-            transaction_df.to_csv(transaction_file, index=False)
+            write_csv(transaction_df, transaction_file)
             print(f"✓ Transaction summary saved: {transaction_file}")
         
         print(f"\nAll CSV files saved in: {current_dir}")
@@ -525,6 +1270,8 @@ def main():
     # Set up command line argument parsing
     parser = argparse.ArgumentParser(description='Inventory Stock Analytics with FIFO')
     parser.add_argument('csv_file', help='Path to the CSV file containing inventory data')
+    parser.add_argument('--verbose', action='store_true',
+                        help='List every unit on the shelf in the detailed aging report instead of one line per lot')
     
     # Parse command line arguments
     args = parser.parse_args()
@@ -539,7 +1286,7 @@ def main():
         analyzer = InventoryAnalyzer(args.csv_file)
         
         # Process all inventory movements
-        analyzer.process_inventory_movements()
+        analyzer.process_inventory_movements_vectorized()
         
         # Generate analytics
         analytics, shelf_time_df = analyzer.generate_analytics()
@@ -548,15 +1295,14 @@ def main():
         analyzer.create_summary_report()
         
         # Print aging summary
-        aging_categories = analyzer.get_aging_summary_by_categories()
-        analyzer.print_aging_summary(aging_categories)
+        analyzer.print_aging_summary(analyzer.get_aging_category_totals())
         
         if analytics and analytics['overall']['total_units_sold'] > 0:
             # Print analytics report only if we have shelf time data
             analyzer.print_analytics_report(analytics)
         
         # Save all reports to CSV files
-        saved_location = analyzer.save_all_reports_to_csv()
+        saved_location = analyzer.save_all_reports_to_csv(verbose=args.verbose)
         
         print("\n" + "="*80)
         print("ANALYSIS COMPLETE!")
@@ -0,0 +1,98 @@
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+
+
+def _random_groups(rng):
+    """
+    Random contiguous groups of signed quantities, as _fifo_movements lays them out
+    """
+    sizes = rng.integers(1, 8, rng.integers(1, 6))
+    group_end = np.cumsum(sizes)
+    group_start = group_end - sizes
+    qtys = rng.integers(-6, 7, group_end[-1]).astype(np.int64)
+    return group_start, group_end, qtys
+
+
+def _write_transactions(path, rows, seed):
+    """
+    Write a random transactions CSV in the documented input format
+    """
+    rand = random.Random(seed)
+    start = datetime(2025, 1, 1, 8, 0)
+    with open(path, 'w', newline='') as out_file:
+        writer = csv.writer(out_file)
+        writer.writerow(['Date', 'Primary SKU', 'Location', 'Qty.', 'Cost', 'Adj. reason'])
+        for _ in range(rows):
+            # Minute resolution over a few weeks, so same-time transactions occur
+            date = start + timedelta(minutes=rand.randint(0, 60 * 24 * 30))
+            qty = rand.choice([rand.randint(1, 40), -rand.randint(1, 25)])
+            cost = round(rand.uniform(10, 500) * qty, 2) if rand.random() > 0.1 else ''
+            writer.writerow([date.strftime(app.DATE_FORMAT), f"SKU-{rand.randint(0, 6):03d}",
+                             rand.choice(['Store A', 'Store B', 'Warehouse']), qty, cost,
+                             rand.choice(['Purchase', 'Sale', 'Damage', 'Transfer'])])
+
+
+class FifoMatcherTest(unittest.TestCase):
+    def test_numpy_matcher_matches_loop(self):
+        # The plain Python loop behind the Numba kernel is the reference
+        loop = getattr(app.fifo_match, 'py_func', app.fifo_match)
+        rng = np.random.default_rng(0)
+        for _ in range(3000):
+            group_start, group_end, qtys = _random_groups(rng)
+            expected = loop(group_start, group_end, qtys)
+            for name, matched in (('numpy', app._fifo_match_numpy(group_start, group_end, qtys)),
+                                  ('fifo_match', app.fifo_match(group_start, group_end, qtys))):
+                for want, got in zip(expected, matched):
+                    np.testing.assert_array_equal(got, want, err_msg=f"{name}: {qtys.tolist()}")
+
+
+class FifoEngineTest(unittest.TestCase):
+    OPENING_STOCK = [
+        {'product': 'SKU-001', 'location': 'Store A', 'qty': 40, 'date': '2024-12-01', 'cost_per_unit': 3},
+        {'product': 'SKU-999', 'location': 'Outlet', 'qty': 5, 'date': '2024-12-01'},
+        # Back-dated behind later receipts once transactions arrive
+        {'product': 'SKU-002', 'location': 'Store B', 'qty': 7, 'date': '2026-01-01', 'cost_per_unit': 9},
+        {'product': 'SKU-003', 'location': 'Warehouse', 'qty': 0, 'date': '2024-12-01'}
+    ]
+
+    def _run(self, path, method):
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer = app.InventoryAnalyzer(path)
+            analyzer.add_opening_stock(self.OPENING_STOCK)
+            getattr(analyzer, method)()
+            analytics, shelf_df = analyzer.generate_analytics()
+            return (analytics, shelf_df, analyzer.get_current_stock_summary(),
+                    analyzer._stock_lots(), list(analyzer.current_stock))
+
+    def test_vectorized_matches_deque_engine(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'transactions.csv')
+            for seed in range(3):
+                _write_transactions(path, 2000, seed)
+                deque_run = self._run(path, 'process_inventory_movements')
+                vectorized_run = self._run(path, 'process_inventory_movements_vectorized')
+
+                # Same records and stock, row for row
+                for expected, actual in zip(deque_run[1:4], vectorized_run[1:4]):
+                    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+                self.assertEqual(vectorized_run[4], deque_run[4])
+                for key, value in deque_run[0]['overall'].items():
+                    self.assertAlmostEqual(vectorized_run[0]['overall'][key], value, msg=key)
+                pd.testing.assert_frame_equal(vectorized_run[0]['by_product'], deque_run[0]['by_product'])
+
+
+if __name__ == '__main__':
+    unittest.main()